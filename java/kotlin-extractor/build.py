@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 
 import argparse
+import concurrent.futures
+import getpass
+import hashlib
 import kotlin_plugin_versions
-import glob
 import platform
 import re
 import subprocess
@@ -11,6 +13,11 @@ import os
 import os.path
 import sys
 import shlex
+import tempfile
+import threading
+import time
+import atexit
+import zipfile
 
 
 def parse_args():
@@ -25,6 +32,10 @@ def parse_args():
                         help='Build for a specific version/kind')
     parser.add_argument('--single-version-embeddable', action='store_true',
                         help='When building a single version, build an embeddable extractor (default is standalone)')
+    parser.add_argument('--use-ekotlinc', action='store_true',
+                        help='Compile with ekotlinc instead of kotlinc')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Keep build dirs between runs and let kotlinc compile incrementally')
     return parser.parse_args()
 
 
@@ -41,29 +52,29 @@ def is_windows():
 
 
 # kotlinc might be kotlinc.bat or kotlinc.cmd on Windows, so we use `which` to find out what it is
-kotlinc = shutil.which('kotlinc')
+kotlinc_name = 'ekotlinc' if args.use_ekotlinc else 'kotlinc'
+kotlinc = shutil.which(kotlinc_name)
 if kotlinc is None:
-    print("Cannot build the Kotlin extractor: no kotlinc found on your PATH", file=sys.stderr)
+    print("Cannot build the Kotlin extractor: no %s found on your PATH" % kotlinc_name, file=sys.stderr)
     sys.exit(1)
 
 javac = 'javac'
 kotlin_dependency_folder = args.dependencies
 
 
-def quote_for_batch(arg):
-    if ';' in arg or '=' in arg:
-        if '"' in arg:
-            raise Exception('Need to quote something containing a quote')
-        return '"' + arg + '"'
-    else:
-        return arg
+# Logging every command means a shlex.join per invocation, which is O(total
+# argument length); only pay for it when asked:
+VERBOSE = os.environ.get('BUILD_VERBOSE') == '1'
 
 
 def run_process(cmd, capture_output=False):
-    print("Running command: " + shlex.join(cmd))
-    if is_windows():
-        cmd = ' '.join(map(quote_for_batch, cmd))
-        print("Converted to Windows command: " + cmd)
+    if VERBOSE:
+        print("Running command: " + shlex.join(cmd))
+    # Batch scripts (kotlinc.bat/kotlinc.cmd) can't be spawned directly by
+    # CreateProcess, so run those through the shell; everything else runs in
+    # list form with no shell and no re-quoting:
+    if is_windows() and cmd[0].lower().endswith(('.bat', '.cmd')):
+        cmd = ['cmd', '/c'] + cmd
     try:
         if capture_output:
             return subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
@@ -71,8 +82,7 @@ def run_process(cmd, capture_output=False):
             return subprocess.run(cmd, check=True)
     except subprocess.CalledProcessError as e:
         print("In: " + os.getcwd(), file=sys.stderr)
-        shell_cmd = cmd if is_windows() else shlex.join(cmd)
-        print("Command failed: " + shell_cmd, file=sys.stderr)
+        print("Command failed: " + shlex.join(cmd), file=sys.stderr)
         if capture_output:
             print("stdout output:\n" + e.stdout.decode(encoding='UTF-8',
                   errors='replace'), file=sys.stderr)
@@ -81,84 +91,311 @@ def run_process(cmd, capture_output=False):
         raise e
 
 def write_arg_file(arg_file, args):
-    with open(arg_file, 'w') as f:
-        for arg in args:
-            if "'" in arg:
-                raise Exception('Single quote in argument: ' + arg)
-            f.write("'" + arg.replace('\\', '/') + "'\n")
-
-def compile_to_dir(build_dir, srcs, version, classpath, java_classpath, output):
-    # Use kotlinc to compile .kt files:
-    kotlin_arg_file = build_dir + '/kotlin.args'
-    kotlin_args = ['-Werror',
-                   '-opt-in=kotlin.RequiresOptIn',
-                   '-opt-in=org.jetbrains.kotlin.ir.symbols.IrSymbolInternals',
-                   '-d', output,
-                   '-module-name', 'codeql-kotlin-extractor',
-                   '-Xsuppress-version-warnings',
-                   '-language-version', version.toLanguageVersionString(),
-                   '-no-reflect', '-no-stdlib',
-                   '-jvm-target', '1.8',
-                   '-classpath', classpath] + srcs
+    # build the content up front and write it in one go, rather than one
+    # small write per argument:
+    lines = []
+    for arg in args:
+        if "'" in arg:
+            raise Exception('Single quote in argument: ' + arg)
+        lines.append("'" + arg.replace('\\', '/') + "'\n")
+    with open(arg_file, 'w', buffering=262144) as f:
+        f.write(''.join(lines))
+
+
+def make_arg_file(build_dir, name):
+    '''Pick where to write an @-file for the compiler: a tmpfs-backed temp
+       file when /dev/shm is available (so the args never touch disk),
+       otherwise inside build_dir'''
+    if not is_windows() and os.path.isdir('/dev/shm'):
+        fd, arg_file = tempfile.mkstemp(prefix=name + '-', suffix='.args', dir='/dev/shm')
+        os.close(fd)
+        return arg_file
+    return build_dir + '/' + name + '.args'
+
+# deletions still running in the background; joined at process exit:
+_pending_deletes = []
+
+
+def async_rmtree(path):
+    '''Rename path aside and delete it in a background thread, so the unlink
+       storm for large trees stays off the critical path'''
+    trash = path + '.trash-%d-%d' % (os.getpid(), time.time_ns())
+    os.rename(path, trash)
+    t = threading.Thread(target=shutil.rmtree, args=(trash,),
+                         kwargs={'ignore_errors': True}, daemon=True)
+    t.start()
+    _pending_deletes.append(t)
+
+
+@atexit.register
+def _join_pending_deletes():
+    for t in _pending_deletes:
+        t.join()
+
+
+# Session id reused across daemon invocations so all compiles in this run
+# attach to the same compiler daemon:
+_daemon_session = None
+
+
+def run_kotlinc(arg_file):
+    global _daemon_session
+    # If a kotlin-daemon-client jar is available, compile through the daemon
+    # so the JVM+compiler initialization cost is only paid once per run
+    # rather than once per invocation:
+    daemon_client = os.environ.get('KOTLIN_DAEMON_CLIENT')
+    if daemon_client is not None:
+        if _daemon_session is None:
+            _daemon_session = 'codeql-kotlin-extractor-' + str(os.getpid())
+        run_process(['java',
+                     '-Dkotlin.daemon.client.session.id=' + _daemon_session,
+                     '-cp', daemon_client,
+                     'org.jetbrains.kotlin.daemon.client.KotlinCompilerClient',
+                     '@' + arg_file])
+    else:
+        run_process([kotlinc,
+                    # kotlinc can default to 256M, which isn't enough when we are extracting the build
+                    '-J-Xmx2G',
+                    '@' + arg_file])
+
+
+# kotlinc options that don't depend on the version/kind being built:
+_KOTLIN_ARGS_BASE = ('-Werror',
+                     '-opt-in=kotlin.RequiresOptIn',
+                     '-opt-in=org.jetbrains.kotlin.ir.symbols.IrSymbolInternals',
+                     '-module-name', 'codeql-kotlin-extractor',
+                     '-Xsuppress-version-warnings',
+                     '-no-reflect', '-no-stdlib',
+                     '-jvm-target', '1.8')
+
+
+def compile_to_dir(build_dir, tmp_src_dir, srcs, version, classpath, java_classpath, output):
+    # Use kotlinc to compile the .kt files; -Xjava-source-roots lets it
+    # resolve symbols from the Java sources without a separate stub pass:
+    kotlin_arg_file = make_arg_file(build_dir, 'kotlin')
+    kotlin_args = list(_KOTLIN_ARGS_BASE)
+    if args.incremental:
+        kotlin_args += ['-Xuse-fast-jar-file-system',
+                        '-Xenable-incremental-compilation']
+    kotlin_args \
+        += ['-d', output,
+           '-language-version', version.toLanguageVersionString(),
+           '-Xjava-source-roots=' + tmp_src_dir + '/main/java',
+           '-classpath', os.path.pathsep.join([classpath, java_classpath])] \
+        + [s for s in srcs if s.endswith('.kt')]
     write_arg_file(kotlin_arg_file, kotlin_args)
-    run_process([kotlinc,
-                # kotlinc can default to 256M, which isn't enough when we are extracting the build
-                '-J-Xmx2G',
-                '@' + kotlin_arg_file])
-
-    # Use javac to compile .java files, referencing the Kotlin class files:
-    java_arg_file = build_dir + '/java.args'
+    run_kotlinc(kotlin_arg_file)
+    # tmpfs-backed arg files would otherwise accumulate in /dev/shm, but
+    # only remove them on success: on failure run_process has just printed
+    # the @-file path, and the file must stay around for debugging (ones
+    # written into build_dir are always kept):
+    if not kotlin_arg_file.startswith(build_dir):
+        os.remove(kotlin_arg_file)
+
+    # Use javac to compile the .java files, referencing the Kotlin class
+    # files; kotlinc only resolves against Java sources, it never emits
+    # class files for them:
+    java_arg_file = make_arg_file(build_dir, 'java')
     java_args = ['-d', output,
                  '-source', '8', '-target', '8',
                  '-classpath', os.path.pathsep.join([output, classpath, java_classpath])] \
               + [s for s in srcs if s.endswith(".java")]
     write_arg_file(java_arg_file, java_args)
     run_process([javac, '@' + java_arg_file])
+    if not java_arg_file.startswith(build_dir):
+        os.remove(java_arg_file)
+
+
+def add_tree_to_jar(zf, base_dir, rel='.'):
+    '''Add base_dir/rel to the jar, with entry names relative to base_dir
+       (mirroring the jar tool's -C base_dir rel)'''
+    top = os.path.join(base_dir, rel)
+    if os.path.isfile(top):
+        zf.write(top, os.path.relpath(top, base_dir))
+        return
+    for root, dirs, files in os.walk(top):
+        for f in files:
+            p = os.path.join(root, f)
+            zf.write(p, os.path.relpath(p, base_dir))
 
 
 def compile_to_jar(build_dir, tmp_src_dir, srcs, version, classpath, java_classpath, output):
+    # Compile into a class dir: the javac half of the build can only write
+    # class files to a directory, so the jar is archived from there:
     class_dir = build_dir + '/classes'
 
-    if os.path.exists(class_dir):
-        shutil.rmtree(class_dir)
-    os.makedirs(class_dir)
+    if args.incremental:
+        # keep the class dir between runs, so kotlinc's incremental
+        # compilation has previous output to reuse:
+        os.makedirs(class_dir, exist_ok=True)
+    else:
+        if os.path.exists(class_dir):
+            shutil.rmtree(class_dir)
+        os.makedirs(class_dir)
 
-    compile_to_dir(build_dir, srcs, version, classpath, java_classpath, class_dir)
+    compile_to_dir(build_dir, tmp_src_dir, srcs, version, classpath, java_classpath, class_dir)
 
-    run_process(['jar', 'cf', output,
-                 '-C', class_dir, '.',
-                 '-C', tmp_src_dir + '/main/resources', 'META-INF',
-                 '-C', tmp_src_dir + '/main/resources', 'com/github/codeql/extractor.name'])
-    shutil.rmtree(class_dir)
+    # Write the jar with ZIP_STORED: the output is consumed locally, so
+    # DEFLATE is wasted CPU:
+    resource_dir = tmp_src_dir + '/main/resources'
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as zf:
+        add_tree_to_jar(zf, class_dir)
+        add_tree_to_jar(zf, resource_dir, 'META-INF')
+        add_tree_to_jar(zf, resource_dir, 'com/github/codeql/extractor.name')
+    if not args.incremental:
+        async_rmtree(class_dir)
 
 
 def find_sources(path):
-    return glob.glob(path + '/**/*.kt', recursive=True) + glob.glob(path + '/**/*.java', recursive=True)
-
-
-def find_jar(path, base):
-    fn = path + '/' + base + '.jar'
-    if not os.path.isfile(fn):
-        raise Exception('Cannot find jar file at %s' % fn)
-    return fn
+    # a single os.walk rather than one recursive glob per extension, so the
+    # tree is only traversed once:
+    srcs = []
+    for root, dirs, files in os.walk(path):
+        for f in files:
+            if f.endswith(('.kt', '.java')):
+                srcs.append(os.path.join(root, f))
+    return srcs
 
 
 def bases_to_classpath(path, bases):
+    # one listdir instead of one isfile stat per base:
+    available = set(os.listdir(path))
     result = []
     for base in bases:
-        result.append(find_jar(path, base))
+        fn = base + '.jar'
+        if fn not in available:
+            raise Exception('Cannot find jar file at %s' % (path + '/' + fn))
+        result.append(path + '/' + fn)
     return os.path.pathsep.join(result)
 
 
+# The embeddable compiler jar ships the IntelliJ classes under a shaded
+# package, so imports need rewriting:
+_IMPORT_RE = re.compile(rb'\bimport com\.intellij')
+_IMPORT_REPLACEMENT = b'import org.jetbrains.kotlin.com.intellij'
+
+
+def _rewrite_one(src):
+    # a sidecar stamp marks files already rewritten by an earlier run over
+    # the same tree (e.g. when the build dir is being reused), reducing the
+    # per-file cost to a single stat:
+    stamp = src + '.embeddable_stamp'
+    if os.path.exists(stamp):
+        return
+    with open(src, 'rb', buffering=262144) as f:
+        content = f.read()
+    # most files don't import com.intellij at all; skip the rewrite
+    # (and the write-back) for those:
+    if b'import com.intellij' not in content:
+        return
+    content = _IMPORT_RE.sub(_IMPORT_REPLACEMENT, content)
+    # break any hardlink to the cached copy of this file, so the cache
+    # isn't rewritten in place:
+    os.unlink(src)
+    with open(src, 'wb') as f:
+        f.write(content)
+    open(stamp, 'wb').close()
+
+
 def transform_to_embeddable(srcs):
-    # replace imports in files:
-    for src in srcs:
-        with open(src, 'r') as f:
-            content = f.read()
-        content = content.replace('import com.intellij',
-                                  'import org.jetbrains.kotlin.com.intellij')
-        with open(src, 'w') as f:
-            f.write(content)
+    # replace imports in files; each file is independent and the work is
+    # I/O-bound, so threads overlap the reads and writes nicely:
+    # os.cpu_count() can return None:
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # consume the iterator so any exception is propagated:
+        list(executor.map(_rewrite_one, srcs))
+
+
+def link_tree(src, dst):
+    '''Recursively hardlink the files of src into dst, copying where linking
+       isn't possible (e.g. across filesystems)'''
+    for root, dirs, files in os.walk(src):
+        rel = os.path.relpath(root, src)
+        dst_root = dst if rel == '.' else os.path.join(dst, rel)
+        os.makedirs(dst_root, exist_ok=True)
+        for f in files:
+            src_file = os.path.join(root, f)
+            dst_file = os.path.join(dst_root, f)
+            try:
+                os.link(src_file, dst_file)
+            except OSError:
+                shutil.copy2(src_file, dst_file)
+
+
+def overlay(src, dst):
+    '''Overlay the files of src onto dst, overwriting any existing files.
+       Files are hardlinked where possible and metadata isn't copied.'''
+    for root, dirs, files in os.walk(src):
+        rel = os.path.relpath(root, src)
+        dst_root = dst if rel == '.' else os.path.join(dst, rel)
+        os.makedirs(dst_root, exist_ok=True)
+        for f in files:
+            src_file = os.path.join(root, f)
+            dst_file = os.path.join(dst_root, f)
+            try:
+                # link to a temporary name, as os.link can't overwrite:
+                tmp_file = dst_file + '.overlay'
+                os.link(src_file, tmp_file)
+                os.replace(tmp_file, dst_file)
+            except OSError:
+                shutil.copyfile(src_file, dst_file)
+
+
+def src_tree_key(version_str, output):
+    '''Hash identifying the assembled source tree for a given build, covering
+       the contents of src/ and which version/kind is being built'''
+    h = hashlib.sha1()
+    h.update(('%s\0%s\0' % (version_str, output)).encode('utf-8'))
+    entries = []
+    for root, dirs, files in os.walk('src'):
+        for f in files:
+            p = os.path.join(root, f)
+            st = os.stat(p)
+            entries.append('%s\0%d\0%d' % (p, st.st_mtime_ns, st.st_size))
+    for entry in sorted(entries):
+        h.update(entry.encode('utf-8') + b'\n')
+    return h.hexdigest()
+
+
+# Which known versions apply to (are <=) each buildable version, computed
+# once instead of rescanned on every compile:
+_applicable_versions = {
+    v.toString(): [a for a in kotlin_plugin_versions.many_versions_versions_asc
+                   if a.lessThanOrEqual(v)]
+    for v in kotlin_plugin_versions.many_versions_versions_asc}
+
+
+def assemble_src_tree(dst_dir, version, output):
+    '''Build the per-version source tree: src/ plus the applicable version
+       folders overlaid into utils/this_version'''
+    # Hardlink rather than copy: transform_to_embeddable breaks the links
+    # before rewriting files, so src/ itself is never mutated.
+    link_tree('src', dst_dir)
+
+    include_version_folder = dst_dir + '/main/kotlin/utils/this_version'
+    os.makedirs(include_version_folder)
+
+    resource_dir = dst_dir + '/main/resources/com/github/codeql'
+    os.makedirs(resource_dir)
+    with open(resource_dir + '/extractor.name', 'w') as f:
+        f.write(output)
+
+    applicable = _applicable_versions.get(version.toString())
+    if applicable is None:
+        # an unknown version (e.g. --single-version with a new release);
+        # fall back to scanning:
+        applicable = [a for a in kotlin_plugin_versions.many_versions_versions_asc
+                      if a.lessThanOrEqual(version)]
+    for a_version in applicable:
+        d = dst_dir + '/main/kotlin/utils/versions/v_' + \
+            a_version.toString().replace('.', '_')
+        if os.path.exists(d):
+            # link and overwrite files from the version folder to the include folder
+            overlay(d, include_version_folder)
+
+    # remove all version folders:
+    shutil.rmtree(dst_dir + '/main/kotlin/utils/versions')
 
 
 def compile(jars, java_jars, dependency_folder, transform_to_embeddable, output, build_dir, version_str):
@@ -167,30 +404,39 @@ def compile(jars, java_jars, dependency_folder, transform_to_embeddable, output,
 
     tmp_src_dir = build_dir + '/temp_src'
 
-    if os.path.exists(tmp_src_dir):
-        shutil.rmtree(tmp_src_dir)
-    shutil.copytree('src', tmp_src_dir)
-
-    include_version_folder = tmp_src_dir + '/main/kotlin/utils/this_version'
-    os.makedirs(include_version_folder)
-
-    resource_dir = tmp_src_dir + '/main/resources/com/github/codeql'
-    os.makedirs(resource_dir)
-    with open(resource_dir + '/extractor.name', 'w') as f:
-        f.write(output)
-
     version = kotlin_plugin_versions.version_string_to_version(version_str)
 
-    for a_version in kotlin_plugin_versions.many_versions_versions_asc:
-        if a_version.lessThanOrEqual(version):
-            d = tmp_src_dir + '/main/kotlin/utils/versions/v_' + \
-                a_version.toString().replace('.', '_')
-            if os.path.exists(d):
-                # copy and overwrite files from the version folder to the include folder
-                shutil.copytree(d, include_version_folder, dirs_exist_ok=True)
-
-    # remove all version folders:
-    shutil.rmtree(tmp_src_dir + '/main/kotlin/utils/versions')
+    # The assembled tree only depends on src/ and on which build this is, so
+    # cache it and hardlink it into place on rebuilds instead of re-copying
+    # the whole tree:
+    key = src_tree_key(version_str, output)
+    cache_dir = build_dir + '/.cache/' + key
+    # a sibling key file records which tree a kept tmp_src_dir was built
+    # from, so --incremental only reuses it while src/ is unchanged:
+    key_file = tmp_src_dir + '.key'
+    reuse_tmp_src = False
+    if args.incremental and os.path.exists(tmp_src_dir) and os.path.exists(key_file):
+        with open(key_file) as f:
+            reuse_tmp_src = f.read() == key
+    if not reuse_tmp_src:
+        if os.path.exists(tmp_src_dir):
+            shutil.rmtree(tmp_src_dir)
+        if not os.path.exists(cache_dir):
+            assembly_dir = cache_dir + '.tmp'
+            if os.path.exists(assembly_dir):
+                shutil.rmtree(assembly_dir)
+            assemble_src_tree(assembly_dir, version, output)
+            os.rename(assembly_dir, cache_dir)
+            # only the entry for the current src/ state will ever be used
+            # again, so drop older ones rather than letting them pile up
+            # (they occupy RAM when the build dir is on tmpfs):
+            cache_root = os.path.dirname(cache_dir)
+            for entry in os.listdir(cache_root):
+                if entry != key:
+                    shutil.rmtree(os.path.join(cache_root, entry), ignore_errors=True)
+        link_tree(cache_dir, tmp_src_dir)
+        with open(key_file, 'w') as f:
+            f.write(key)
 
     srcs = find_sources(tmp_src_dir)
 
@@ -198,7 +444,23 @@ def compile(jars, java_jars, dependency_folder, transform_to_embeddable, output,
 
     compile_to_jar(build_dir, tmp_src_dir, srcs, version, classpath, java_classpath, output)
 
-    shutil.rmtree(tmp_src_dir)
+    if not args.incremental:
+        async_rmtree(tmp_src_dir)
+
+
+def build_dir_for(name):
+    '''Pick where a build dir lives: it only holds intermediates that are
+       deleted at the end of the build, so prefer tmpfs (BUILD_TMP if set,
+       else /dev/shm where available) over the working directory. The
+       default root is namespaced per user and checkout, since /dev/shm is
+       shared and concurrent builds must not race on the same paths.'''
+    root = os.environ.get('BUILD_TMP')
+    if root is None and not is_windows() and os.path.isdir('/dev/shm'):
+        checkout = hashlib.sha1(os.getcwd().encode('utf-8')).hexdigest()[:12]
+        root = '/dev/shm/codeql-kotlin-%s-%s' % (getpass.getuser(), checkout)
+    if root is None:
+        return name
+    return os.path.join(root, name)
 
 
 def compile_embeddable(version):
@@ -207,7 +469,7 @@ def compile_embeddable(version):
             kotlin_dependency_folder,
             transform_to_embeddable,
             'codeql-extractor-kotlin-embeddable-%s.jar' % (version),
-            'build_embeddable_' + version,
+            build_dir_for('build_embeddable_' + version),
             version)
 
 
@@ -217,21 +479,49 @@ def compile_standalone(version):
             kotlin_dependency_folder,
             lambda srcs: None,
             'codeql-extractor-kotlin-standalone-%s.jar' % (version),
-            'build_standalone_' + version,
+            build_dir_for('build_standalone_' + version),
             version)
 
 
-if args.single_version:
-    if args.single_version_embeddable == True:
-        compile_embeddable(args.single_version)
+def worker_build(build, version):
+    build(version)
+    # Pool workers exit via os._exit, which skips atexit handlers and would
+    # kill the background rmtree threads mid-delete, leaking trash dirs; so
+    # wait for them before the task returns:
+    _join_pending_deletes()
+
+
+def compile_many():
+    # Each version/kind uses its own build_dir, so builds can run
+    # concurrently. Processes (rather than threads) keep the kotlinc/javac
+    # subprocess bookkeeping independent per worker.
+    max_workers = max(1, (os.cpu_count() or 1) // 2)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for version in kotlin_plugin_versions.many_versions:
+            futures.append(executor.submit(worker_build, compile_standalone, version))
+            futures.append(executor.submit(worker_build, compile_embeddable, version))
+        # Propagate any build failure to the main process:
+        for future in futures:
+            future.result()
+
+
+def main():
+    if args.single_version:
+        if args.single_version_embeddable == True:
+            compile_embeddable(args.single_version)
+        else:
+            compile_standalone(args.single_version)
+    elif args.single_version_embeddable == True:
+        print("--single-version-embeddable requires --single-version", file=sys.stderr)
+        sys.exit(1)
+    elif args.many:
+        compile_many()
     else:
-        compile_standalone(args.single_version)
-elif args.single_version_embeddable == True:
-    print("--single-version-embeddable requires --single-version", file=sys.stderr)
-    sys.exit(1)
-elif args.many:
-    for version in kotlin_plugin_versions.many_versions:
-        compile_standalone(version)
-        compile_embeddable(version)
-else:
-    compile_standalone(kotlin_plugin_versions.get_single_version())
+        compile_standalone(kotlin_plugin_versions.get_single_version())
+
+
+# ProcessPoolExecutor may re-import this module in its workers (e.g. when
+# spawning on Windows), so the entry point must be guarded:
+if __name__ == '__main__':
+    main()